@@ -0,0 +1,189 @@
+"""Compiled scoring kernel for the rule-based strategy.
+
+The per-tick decision math in ``MarketAgent.analyze_market`` is pure scalar
+arithmetic, so it lives here where Numba can compile it to native code.
+All inputs and outputs are plain ints/floats — regime and decision are
+passed as integer codes. Falls back to plain Python if numba is missing.
+"""
+import os
+
+try:
+    import numpy as np
+except ImportError:  # only score_all() needs numpy
+    np = None
+
+# The image's __pycache__ isn't persisted on Fly — keep the JIT cache on the
+# volume so restarts load compiled code instead of recompiling
+if os.path.isdir("/data"):
+    os.environ.setdefault("NUMBA_CACHE_DIR", "/data/numba_cache")
+
+try:
+    from numba import njit, prange
+    HAS_NUMBA = True
+except ImportError:
+    HAS_NUMBA = False
+    prange = range
+
+    def njit(*args, **kwargs):
+        """No-op stand-in for numba.njit (bare or with options)."""
+        if len(args) == 1 and callable(args[0]) and not kwargs:
+            return args[0]
+        return lambda fn: fn
+
+
+# Decision codes
+HOLD = 0
+BUY_YES = 1
+BUY_NO = 2
+
+# Volatility regime codes
+REGIME_LOW = 0
+REGIME_MEDIUM = 1
+REGIME_HIGH = 2
+
+MAX_CONTRACT_SECS = 900.0
+
+# (winning_boost_coef, losing_coef) by distance band: 0 = ratio <= 1.0 (unused,
+# both sides keep the raw time factor), 1 = ratio > 1.0, 2 = ratio > 1.5
+_TIME_TABLE = ((0.0, 0.0), (0.4, 0.6), (0.75, 0.3))
+
+
+@njit(cache=True)
+def score(secs_left, best_bid, best_ask, fair_yes_cents, btc_vs_strike,
+          vol_dpm, vel_1m, dir_1m, min_edge, trend_follow_vel, regime_code,
+          sit_out_low):
+    """Score YES/NO for one market.
+
+    Returns (decision_code, confidence, yes_edge, no_edge, yes_score, no_score,
+    yes_time_factor, no_time_factor, distance_ratio). On HOLD, confidence is
+    the best potential confidence (0.0 when sitting out low vol).
+    """
+    # ** 0.5 lowers to a single sqrt instruction under njit
+    sqrt_minutes = ((secs_left if secs_left > 1.0 else 1.0) / 60.0) ** 0.5
+    return _score(secs_left, sqrt_minutes, best_bid, best_ask, fair_yes_cents,
+                  btc_vs_strike, vol_dpm, vel_1m, dir_1m, min_edge,
+                  trend_follow_vel, regime_code, sit_out_low)
+
+
+@njit(cache=True)
+def _score(secs_left, sqrt_minutes, best_bid, best_ask, fair_yes_cents,
+           btc_vs_strike, vol_dpm, vel_1m, dir_1m, min_edge, trend_follow_vel,
+           regime_code, sit_out_low):
+    # sqrt_minutes = sqrt(max(secs_left, 1) / 60), precomputed by the caller
+    # Time decay factor — directional boost for winning side near expiry
+    raw_time_factor = secs_left / MAX_CONTRACT_SECS
+    raw_time_factor = 0.0 if raw_time_factor < 0.0 else (1.0 if raw_time_factor > 1.0 else raw_time_factor)
+
+    # How many "expected moves" is BTC from strike?
+    # Use reasonable floor for vol to avoid division issues when data is sparse
+    vol_floor = vol_dpm if vol_dpm >= 50.0 else 200.0
+    expected_move = vol_floor * sqrt_minutes
+    distance_ratio = abs(btc_vs_strike) / (expected_move if expected_move > 50.0 else 50.0)
+    if distance_ratio > 10.0:
+        distance_ratio = 10.0
+
+    band = int(distance_ratio > 1.0) + int(distance_ratio > 1.5)
+    if band == 0:
+        # Too close to strike — both sides stay conservative
+        winning_boost = raw_time_factor
+        losing_factor = raw_time_factor
+    else:
+        # Likely / near-certain outcome — boost winner, penalize loser
+        boost_coef, losing_coef = _TIME_TABLE[band]
+        winning_boost = 1.0 + (1.0 - raw_time_factor) * boost_coef
+        losing_factor = raw_time_factor * losing_coef
+
+    if btc_vs_strike > 0:  # BTC above strike — YES is winning
+        yes_time_factor = winning_boost
+        no_time_factor = losing_factor
+    else:  # BTC below strike — NO is winning
+        yes_time_factor = losing_factor
+        no_time_factor = winning_boost
+
+    # Edge on each side
+    fair_no_cents = 100 - fair_yes_cents
+    yes_edge = fair_yes_cents - best_ask
+    no_edge = fair_no_cents - (100 - best_bid)
+
+    decision_code = HOLD
+    confidence = 0.0
+    yes_score = 0.0
+    no_score = 0.0
+
+    if not (sit_out_low and regime_code == REGIME_LOW):
+        # High vol: relax edge, add trend bonus
+        if regime_code == REGIME_HIGH:
+            min_edge = min_edge - 3 if min_edge > 6 else 3
+        fast_trend = regime_code == REGIME_HIGH and abs(vel_1m) > trend_follow_vel
+
+        # Score YES — edge/100 spreads confidence over a wider range
+        if yes_edge >= min_edge:
+            yes_score = yes_edge / 100.0
+            if dir_1m > 0:
+                yes_score += 0.10
+                if fast_trend:
+                    yes_score += 0.05
+            yes_score *= yes_time_factor
+
+        # Score NO
+        if no_edge >= min_edge:
+            no_score = no_edge / 100.0
+            if dir_1m < 0:
+                no_score += 0.10
+                if fast_trend:
+                    no_score += 0.05
+            no_score *= no_time_factor
+
+        if yes_score > no_score and yes_score > 0:
+            decision_code = BUY_YES
+            confidence = 0.45 + yes_score
+        elif no_score > yes_score and no_score > 0:
+            decision_code = BUY_NO
+            confidence = 0.45 + no_score
+        else:
+            # No edge — report what confidence would be if there was edge
+            potential_yes_conf = 0.45 + yes_edge / 100.0 * yes_time_factor if yes_edge > 0 else 0.0
+            potential_no_conf = 0.45 + no_edge / 100.0 * no_time_factor if no_edge > 0 else 0.0
+            confidence = potential_yes_conf if potential_yes_conf > potential_no_conf else potential_no_conf
+        if confidence > 0.95:  # cap applies to traded and potential confidence alike
+            confidence = 0.95
+
+    return (decision_code, confidence, yes_edge, no_edge, yes_score, no_score,
+            yes_time_factor, no_time_factor, distance_ratio)
+
+
+@njit(parallel=True, cache=True)
+def score_all(secs_left_arr, best_bids, best_asks, fair_yes_cents_arr,
+              btc_vs_strike_arr, vol_dpm, vel_1m, dir_1m, min_edge,
+              trend_follow_vel, regime_code, sit_out_low):
+    """Score many markets at once; per-market inputs are equal-length arrays.
+
+    BTC-wide inputs (vol, velocity, regime) and thresholds are shared scalars.
+    Returns (decision_codes, confidences, edges) arrays, where edge is the
+    chosen side's edge (the larger of the two on HOLD). Requires numpy.
+    """
+    n = len(secs_left_arr)
+    decision_codes = np.empty(n, np.int64)
+    confidences = np.empty(n, np.float64)
+    edges = np.empty(n, np.int64)
+    sqrt_minutes = np.sqrt(np.maximum(secs_left_arr, 1.0) / 60.0)  # vectorized over all markets
+    for i in prange(n):
+        result = _score(secs_left_arr[i], sqrt_minutes[i], best_bids[i],
+                        best_asks[i], fair_yes_cents_arr[i], btc_vs_strike_arr[i],
+                        vol_dpm, vel_1m, dir_1m, min_edge, trend_follow_vel,
+                        regime_code, sit_out_low)
+        decision_codes[i] = result[0]
+        confidences[i] = result[1]
+        if result[0] == BUY_YES:
+            edges[i] = result[2]
+        elif result[0] == BUY_NO:
+            edges[i] = result[3]
+        else:
+            edges[i] = result[2] if result[2] > result[3] else result[3]
+    return decision_codes, confidences, edges
+
+
+# Compile (or load from cache) at import so the first live tick doesn't pay
+# for JIT. Argument types must match the casts in MarketAgent.analyze_market.
+if HAS_NUMBA:
+    score(1.0, 0, 100, 50, 0.0, 0.0, 0.0, 0, 3, 2.0, REGIME_MEDIUM, False)
@@ -1,7 +1,9 @@
+import hashlib
 import json
-import math
+import time
 import config
 from database import log_event, record_decision
+from _score_kernel import score, BUY_YES, BUY_NO, REGIME_LOW, REGIME_MEDIUM, REGIME_HIGH
 
 try:
     import anthropic
@@ -9,17 +11,128 @@ try:
 except ImportError:
     HAS_ANTHROPIC = False
 
+try:
+    import orjson
+    HAS_ORJSON = True
+except ImportError:
+    HAS_ORJSON = False
+
+_REGIME_CODES = {"low": REGIME_LOW, "medium": REGIME_MEDIUM, "high": REGIME_HIGH}
+
+# Repeat decisions (same side, confidence within 2pp) are only written to the
+# DB/log once per heartbeat interval
+_DEDUP_CONFIDENCE = 0.02
+_DECISION_HEARTBEAT_SECS = 60
+
+# Max chat messages kept/sent per conversation before rebuilding from history
+_CHAT_MAX_MESSAGES = 40
+
+# Config keys included in chat context (tuple keeps JSON key order stable)
+_CHAT_CONFIG_KEYS = ("MIN_EDGE_CENTS", "RULE_MIN_CONFIDENCE", "VOL_HIGH_THRESHOLD",
+                     "VOL_LOW_THRESHOLD", "LEAD_LAG_THRESHOLD", "DELTA_THRESHOLD")
+
+# Chat system prompt and tool definitions (built once per process)
+_SYSTEM_PROMPT = """You are the AI advisor for a Kalshi BTC 15-minute binary options trading bot. You have access to live data about the bot's performance, current market conditions, and configuration.
+
+Your role is to:
+1. Answer questions about current market conditions and the bot's decisions
+2. Analyze trading performance and suggest improvements
+3. Recommend config adjustments based on observed patterns
+4. Explain why the bot is making certain decisions
+5. Help interpret alpha signals (momentum, volatility, lead-lag, fair value)
+6. USE THE update_config TOOL when the user asks you to change settings
+
+Key concepts:
+- YES/NO are binary outcomes based on whether BTC price is above/below the strike at settlement
+- Edge = fair_value - market_price (positive edge means opportunity)
+- Volatility affects fair value calculation (higher vol = more uncertainty = prices closer to 50c)
+- Lead-lag signal detects when BTC moved but Kalshi hasn't repriced yet
+- Confidence threshold determines whether to trade
+
+Available config parameters you can change:
+- RULE_MIN_CONFIDENCE: Minimum confidence to trade (0.0-1.0, default 0.7)
+- MIN_EDGE_CENTS: Minimum edge in cents to trade (1-20, default 4)
+- VOL_HIGH_THRESHOLD: High volatility threshold $/min (50-2000, default 400)
+- VOL_LOW_THRESHOLD: Low volatility threshold $/min (20-1000, default 200)
+- LEAD_LAG_THRESHOLD: Lead-lag signal threshold $ (10-500, default 75)
+- DELTA_THRESHOLD: Momentum threshold for front-run (5-100, default 20)
+
+When asked to change settings, USE THE TOOL - don't just suggest changes. After changing, confirm what you changed."""
+
+# Tool for updating config from chat
+_TOOLS = [
+    {
+        "name": "update_config",
+        "description": "Update a bot configuration setting. Use this when the user asks to change a setting.",
+        "input_schema": {
+            "type": "object",
+            "properties": {
+                "setting": {
+                    "type": "string",
+                    "description": "The config key to update (e.g., RULE_MIN_CONFIDENCE, MIN_EDGE_CENTS)"
+                },
+                "value": {
+                    "type": "number",
+                    "description": "The new value for the setting"
+                }
+            },
+            "required": ["setting", "value"]
+        }
+    }
+]
+
+
+def _dumps(obj) -> str:
+    """Compact JSON for chat payloads — orjson when installed, else stdlib json."""
+    if HAS_ORJSON:
+        return orjson.dumps(
+            obj, default=str, option=orjson.OPT_NON_STR_KEYS | orjson.OPT_SERIALIZE_NUMPY,
+        ).decode()
+    return json.dumps(obj, default=str, separators=(",", ":"))
+
+
+def _transcript_hash(history: list[dict]) -> str:
+    """Fingerprint of a client-side chat transcript (role/content turns)."""
+    return hashlib.md5(_dumps(history).encode()).hexdigest()
+
+
+def _context_delta(old: dict, new: dict) -> dict:
+    """Per-section changes between two chat context dicts (removed keys -> None)."""
+    delta = {}
+    for section in {**old, **new}:
+        before, after = old.get(section), new.get(section)
+        if before == after:
+            continue
+        if isinstance(before, dict) and isinstance(after, dict):
+            delta[section] = {k: after.get(k) for k in {**before, **after}
+                              if before.get(k) != after.get(k)}
+        else:
+            delta[section] = after
+    return delta
+
 
 class MarketAgent:
+    __slots__ = ("_client", "last_decision", "_last_logged",
+                 "_chat_messages", "_chat_context", "_chat_transcript_hash")
+
     def __init__(self):
-        # Anthropic client is only needed for chat, not trading decisions
-        self.client = None
-        if HAS_ANTHROPIC and config.ANTHROPIC_API_KEY:
-            self.client = anthropic.AsyncAnthropic(
+        self._client = None
+        self.last_decision: dict | None = None
+        self._last_logged: tuple[str | None, str, float, float] | None = None  # (market_id, decision, confidence, ts)
+        # Chat conversation as last sent to the API, reused while the client continues it
+        self._chat_messages: list[dict] = []
+        self._chat_context: dict = {}
+        self._chat_transcript_hash: str | None = None
+
+    @property
+    def client(self):
+        """Anthropic client, created on first use — only chat needs it, not trading."""
+        if self._client is None and HAS_ANTHROPIC and config.ANTHROPIC_API_KEY:
+            self._client = anthropic.AsyncAnthropic(
                 api_key=config.ANTHROPIC_API_KEY,
                 timeout=60.0,
             )
-        self.last_decision: dict | None = None
+        return self._client
 
     # ------------------------------------------------------------------
     # Rule-based trading decision (replaces Claude API call)
@@ -43,9 +156,16 @@ class MarketAgent:
         secs_left = market_data.get("seconds_to_close", 0)
         best_bid = market_data.get("best_bid", 0)
         best_ask = market_data.get("best_ask", 100)
+        ticker = market_data.get("ticker")
 
         if not alpha_monitor or not strike or strike <= 0:
-            return self._hold("No strike price or alpha data available")
+            return self._hold("No strike price or alpha data available", market_id=ticker)
+
+        # Read tunables once per call (they can change at runtime via set_tunables)
+        sit_out_low = config.RULE_SIT_OUT_LOW_VOL
+        min_edge_cfg = config.MIN_EDGE_CENTS
+        trend_vel_cfg = config.TREND_FOLLOW_VELOCITY
+        min_conf_cfg = config.RULE_MIN_CONFIDENCE
 
         # 1. Fair value estimation
         fv = alpha_monitor.get_fair_value(strike, secs_left)
@@ -63,39 +183,15 @@ class MarketAgent:
         dir_1m = velocity["direction_1m"]
         change_1m = velocity["price_change_1m"]
 
-        # 4. Time decay factor — directional boost for winning side near expiry
-        # When BTC is far from strike and time is running out, the winning side
-        # should get MORE confident (time decay working in their favor), not less.
-        max_contract_secs = 900.0
-        raw_time_factor = min(1.0, max(0.0, secs_left / max_contract_secs))
-
-        # How many "expected moves" is BTC from strike?
-        # Use reasonable floor for vol to avoid division issues when data is sparse
-        vol_dpm = vol["vol_dollar_per_min"] if vol["vol_dollar_per_min"] >= 50 else 200
-        expected_move = vol_dpm * math.sqrt(max(secs_left, 1) / 60)
-        distance_ratio = min(10.0, abs(btc_vs_strike) / max(expected_move, 50))
-
-        # Compute directional time factors (aggressive settings)
-        if distance_ratio > 1.5:
-            # Outcome is near-certain — strong boost to winning side
-            winning_boost = 1.0 + (1.0 - raw_time_factor) * 0.75  # up to 1.75x near expiry
-            losing_factor = raw_time_factor * 0.3  # heavily penalize losing side
-        elif distance_ratio > 1.0:
-            # Likely outcome — moderate boost to winner
-            winning_boost = 1.0 + (1.0 - raw_time_factor) * 0.4  # up to 1.4x near expiry
-            losing_factor = raw_time_factor * 0.6
-        else:
-            # Too close to strike — both sides stay conservative
-            winning_boost = raw_time_factor
-            losing_factor = raw_time_factor
-
-        # Assign based on which side is winning
-        if btc_vs_strike > 0:  # BTC above strike — YES is winning
-            yes_time_factor = winning_boost
-            no_time_factor = losing_factor
-        else:  # BTC below strike — NO is winning
-            yes_time_factor = losing_factor
-            no_time_factor = winning_boost
+        # 4. Score both sides in the compiled kernel (edge, trend, vol, time decay)
+        (decision_code, confidence, yes_edge, no_edge, yes_score, no_score,
+         yes_time_factor, no_time_factor, distance_ratio) = score(
+            float(secs_left), int(best_bid), int(best_ask), int(fair_yes_cents),
+            float(btc_vs_strike), float(vol["vol_dollar_per_min"]),
+            float(vel_1m), int(dir_1m), int(min_edge_cfg),
+            float(trend_vel_cfg), _REGIME_CODES.get(regime, REGIME_MEDIUM),
+            bool(sit_out_low),
+        )
 
         # Build reasoning trace
         reasons = []
@@ -106,74 +202,31 @@ class MarketAgent:
         reasons.append(f"Time: {secs_left:.0f}s left (dist={distance_ratio:.1f}x, Y×{yes_time_factor:.2f}/N×{no_time_factor:.2f})")
 
         # Low-vol sit-out
-        if config.RULE_SIT_OUT_LOW_VOL and regime == "low":
-            return self._hold(f"Low vol — sitting out. {'; '.join(reasons)}")
+        if sit_out_low and regime == "low":
+            return self._hold(f"Low vol — sitting out. {'; '.join(reasons)}", market_id=ticker)
 
-        # Compute edge on each side
-        yes_cost = best_ask
+        fair_no_cents = 100 - fair_yes_cents
         no_cost = 100 - best_bid
-        yes_edge = fair_yes_cents - yes_cost
-        no_edge = (100 - fair_yes_cents) - no_cost
-
-        reasons.append(f"YES edge: {yes_edge:+d}c (fair {fair_yes_cents} vs ask {yes_cost})")
-        reasons.append(f"NO edge: {no_edge:+d}c (fair {100 - fair_yes_cents} vs cost {no_cost})")
-
-        min_edge = config.MIN_EDGE_CENTS
-
-        # Trend confirmation
-        trend_confirms_yes = dir_1m > 0
-        trend_confirms_no = dir_1m < 0
-
-        # High vol: relax edge, add trend bonus
-        if regime == "high":
-            min_edge = max(3, min_edge - 3)
-
-        # Score YES — edge/100 spreads confidence over a wider range
-        yes_score = 0.0
-        if yes_edge >= min_edge:
-            yes_score = yes_edge / 100.0
-            if trend_confirms_yes:
-                yes_score += 0.10
-                if regime == "high" and abs(vel_1m) > config.TREND_FOLLOW_VELOCITY:
-                    yes_score += 0.05
-            yes_score *= yes_time_factor
-
-        # Score NO
-        no_score = 0.0
-        if no_edge >= min_edge:
-            no_score = no_edge / 100.0
-            if trend_confirms_no:
-                no_score += 0.10
-                if regime == "high" and abs(vel_1m) > config.TREND_FOLLOW_VELOCITY:
-                    no_score += 0.05
-            no_score *= no_time_factor
+        reasons.append(f"YES edge: {yes_edge:+d}c (fair {fair_yes_cents} vs ask {best_ask})")
+        reasons.append(f"NO edge: {no_edge:+d}c (fair {fair_no_cents} vs cost {no_cost})")
 
         # Pick the best side
-        decision = "HOLD"
-        confidence = 0.0
-
-        # Calculate potential confidence for both sides (even if no edge)
-        potential_yes_conf = min(0.95, 0.45 + max(0, yes_edge / 100.0) * yes_time_factor) if yes_edge > 0 else 0.0
-        potential_no_conf = min(0.95, 0.45 + max(0, no_edge / 100.0) * no_time_factor) if no_edge > 0 else 0.0
-        best_potential = max(potential_yes_conf, potential_no_conf)
-
-        if yes_score > no_score and yes_score > 0:
+        if decision_code == BUY_YES:
             decision = "BUY_YES"
-            confidence = min(0.95, 0.45 + yes_score)
             reasons.append(f"-> BUY YES (score {yes_score:.2f}, edge {yes_edge}c"
-                           + (", trend OK" if trend_confirms_yes else "") + ")")
-        elif no_score > yes_score and no_score > 0:
+                           + (", trend OK" if dir_1m > 0 else "") + ")")
+        elif decision_code == BUY_NO:
             decision = "BUY_NO"
-            confidence = min(0.95, 0.45 + no_score)
             reasons.append(f"-> BUY NO (score {no_score:.2f}, edge {no_edge}c"
-                           + (", trend OK" if trend_confirms_no else "") + ")")
+                           + (", trend OK" if dir_1m < 0 else "") + ")")
         else:
             # No edge - show what confidence would be if there was edge
-            return self._hold(f"No edge. {'; '.join(reasons)}", confidence=best_potential)
+            return self._hold(f"No edge. {'; '.join(reasons)}", confidence=confidence, market_id=ticker)
 
         # Confidence gate
-        if confidence < config.RULE_MIN_CONFIDENCE:
-            return self._hold(f"Low confidence {confidence:.0%}. {'; '.join(reasons)}", confidence=confidence)
+        if confidence < min_conf_cfg:
+            return self._hold(f"Low confidence {confidence:.0%}. {'; '.join(reasons)}",
+                              confidence=confidence, market_id=ticker)
 
         reasoning = "; ".join(reasons)
         self.last_decision = {
@@ -182,22 +235,38 @@ class MarketAgent:
             "reasoning": reasoning,
         }
 
-        record_decision(
-            market_id=market_data.get("ticker"),
-            decision=decision,
-            confidence=confidence,
-            reasoning=reasoning,
-        )
-        log_event("RULES", f"{decision} ({confidence:.0%}) — {reasoning[:200]}")
+        if not self._is_repeat(ticker, decision, confidence):
+            record_decision(
+                market_id=ticker,
+                decision=decision,
+                confidence=confidence,
+                reasoning=reasoning,
+            )
+            log_event("RULES", f"{decision} ({confidence:.0%}) — {reasoning[:200]}")
         return self.last_decision
 
-    def _hold(self, reasoning: str, confidence: float = 0.0) -> dict:
+    def _hold(self, reasoning: str, confidence: float = 0.0, market_id: str | None = None) -> dict:
         """Return a HOLD decision with optional confidence score."""
         result = {"decision": "HOLD", "confidence": confidence, "reasoning": reasoning}
         self.last_decision = result
-        log_event("RULES", f"HOLD — {reasoning[:200]}")
+        if not self._is_repeat(market_id, "HOLD", confidence):
+            log_event("RULES", f"HOLD — {reasoning[:200]}")
         return result
 
+    def _is_repeat(self, market_id: str | None, decision: str, confidence: float) -> bool:
+        """True if this matches the last logged decision for the same market and no heartbeat is due.
+
+        Otherwise records it as the new last-logged decision and returns False.
+        """
+        now = time.time()
+        last = self._last_logged
+        if (last and last[0] == market_id and last[1] == decision
+                and abs(last[2] - confidence) < _DEDUP_CONFIDENCE
+                and now - last[3] < _DECISION_HEARTBEAT_SECS):
+            return True
+        self._last_logged = (market_id, decision, confidence, now)
+        return False
+
     # ------------------------------------------------------------------
     # Chat (still uses Anthropic API)
     # ------------------------------------------------------------------
@@ -211,7 +280,8 @@ class MarketAgent:
             return "Chat requires ANTHROPIC_API_KEY to be set."
 
         # Build rich context from live data
-        context_parts = []
+        ctx = None
+        key_config = None
 
         if bot_status:
             # Extract key metrics for context
@@ -238,97 +308,64 @@ class MarketAgent:
                 ctx["fair_value"] = dashboard.get("fair_value")
                 ctx["rolling_avg_confidence"] = dashboard.get("rolling_avg_confidence")
                 ctx["rolling_avg_max_confidence"] = dashboard.get("rolling_avg_max_confidence")
-            context_parts.append(f"LIVE STATUS:\n{json.dumps(ctx, default=str, indent=2)}")
-
-        if trades_summary:
-            context_parts.append(f"TRADING PERFORMANCE:\n{json.dumps(trades_summary, indent=2)}")
 
         if config:
             # Only include key config values
-            key_config = {k: v.get("value") if isinstance(v, dict) else v
-                         for k, v in config.items()
-                         if k in ["MIN_EDGE_CENTS", "RULE_MIN_CONFIDENCE", "VOL_HIGH_THRESHOLD",
-                                  "VOL_LOW_THRESHOLD", "LEAD_LAG_THRESHOLD", "DELTA_THRESHOLD"]}
-            context_parts.append(f"KEY CONFIG:\n{json.dumps(key_config, indent=2)}")
-
-        if self.last_decision:
-            context_parts.append(f"LAST DECISION:\n{json.dumps(self.last_decision, indent=2)}")
-
-        context = "\n\n".join(context_parts) + "\n\n" if context_parts else ""
-
-        system_prompt = """You are the AI advisor for a Kalshi BTC 15-minute binary options trading bot. You have access to live data about the bot's performance, current market conditions, and configuration.
-
-Your role is to:
-1. Answer questions about current market conditions and the bot's decisions
-2. Analyze trading performance and suggest improvements
-3. Recommend config adjustments based on observed patterns
-4. Explain why the bot is making certain decisions
-5. Help interpret alpha signals (momentum, volatility, lead-lag, fair value)
-6. USE THE update_config TOOL when the user asks you to change settings
-
-Key concepts:
-- YES/NO are binary outcomes based on whether BTC price is above/below the strike at settlement
-- Edge = fair_value - market_price (positive edge means opportunity)
-- Volatility affects fair value calculation (higher vol = more uncertainty = prices closer to 50c)
-- Lead-lag signal detects when BTC moved but Kalshi hasn't repriced yet
-- Confidence threshold determines whether to trade
-
-Available config parameters you can change:
-- RULE_MIN_CONFIDENCE: Minimum confidence to trade (0.0-1.0, default 0.7)
-- MIN_EDGE_CENTS: Minimum edge in cents to trade (1-20, default 4)
-- VOL_HIGH_THRESHOLD: High volatility threshold $/min (50-2000, default 400)
-- VOL_LOW_THRESHOLD: Low volatility threshold $/min (20-1000, default 200)
-- LEAD_LAG_THRESHOLD: Lead-lag signal threshold $ (10-500, default 75)
-- DELTA_THRESHOLD: Momentum threshold for front-run (5-100, default 20)
-
-When asked to change settings, USE THE TOOL - don't just suggest changes. After changing, confirm what you changed."""
-
-        # Define tool for updating config
-        tools = [
-            {
-                "name": "update_config",
-                "description": "Update a bot configuration setting. Use this when the user asks to change a setting.",
-                "input_schema": {
-                    "type": "object",
-                    "properties": {
-                        "setting": {
-                            "type": "string",
-                            "description": "The config key to update (e.g., RULE_MIN_CONFIDENCE, MIN_EDGE_CENTS)"
-                        },
-                        "value": {
-                            "type": "number",
-                            "description": "The new value for the setting"
-                        }
-                    },
-                    "required": ["setting", "value"]
-                }
-            }
-        ]
-
-        # Build messages list with history
-        messages = []
-
-        # First message includes live context
-        if history:
-            # Add context to first user message, then include history
-            first_msg = history[0] if history else None
-            if first_msg and first_msg.get("role") == "user":
-                messages.append({"role": "user", "content": context + first_msg["content"]})
-                messages.extend(history[1:])
-            else:
-                messages.extend(history)
-            # Add current message
-            messages.append({"role": "user", "content": user_message})
+            key_config = {}
+            for k in _CHAT_CONFIG_KEYS:
+                if k in config:
+                    v = config[k]
+                    key_config[k] = v.get("value") if isinstance(v, dict) else v
+
+        # Serialize everything once, compactly (fewer prompt tokens)
+        context_obj = {
+            "live_status": ctx,
+            "performance": trades_summary,
+            "config": key_config,
+            "last_decision": self.last_decision,
+        }
+        context_obj = {k: v for k, v in context_obj.items() if v}
+
+        history = history or []
+        if (self._chat_messages and len(self._chat_messages) < _CHAT_MAX_MESSAGES
+                and _transcript_hash(history) == self._chat_transcript_hash):
+            # Continuing the conversation we answered last time — reuse the
+            # stored messages and send only the context fields that changed
+            messages = self._chat_messages
+            delta = _context_delta(self._chat_context, context_obj)
+            update = (
+                f"CONTEXT UPDATE:\n{_dumps(delta)}\n\n"
+                if delta else ""
+            )
+            messages.append({"role": "user", "content": update + user_message})
         else:
-            # No history - single message with context
-            messages.append({"role": "user", "content": context + "USER QUESTION: " + user_message})
+            # New, cleared or trimmed conversation — rebuild with full context
+            context = (
+                f"CONTEXT:\n{_dumps(context_obj)}\n\n"
+                if context_obj else ""
+            )
+            recent = history[-(_CHAT_MAX_MESSAGES - 2):]
+            if recent and recent[0].get("role") != "user":
+                recent = recent[1:]
+            messages = []
+
+            # First message includes live context
+            if recent:
+                # Add context to first user message, then include history
+                messages.append({"role": "user", "content": context + recent[0]["content"]})
+                messages.extend(recent[1:])
+                # Add current message
+                messages.append({"role": "user", "content": user_message})
+            else:
+                # No history - single message with context
+                messages.append({"role": "user", "content": context + "USER QUESTION: " + user_message})
 
         try:
             response = await self.client.messages.create(
                 model="claude-3-5-haiku-latest",
                 max_tokens=800,
-                system=system_prompt,
-                tools=tools,
+                system=_SYSTEM_PROMPT,
+                tools=_TOOLS,
                 messages=messages,
             )
 
@@ -358,7 +395,7 @@ When asked to change settings, USE THE TOOL - don't just suggest changes. After
                     tool_results.append({
                         "type": "tool_result",
                         "tool_use_id": block.id,
-                        "content": json.dumps(result)
+                        "content": _dumps(result)
                     })
 
             # If there were tool calls, get final response
@@ -369,11 +406,22 @@ When asked to change settings, USE THE TOOL - don't just suggest changes. After
                 final_response = await self.client.messages.create(
                     model="claude-3-5-haiku-latest",
                     max_tokens=400,
-                    system=system_prompt,
+                    system=_SYSTEM_PROMPT,
                     messages=messages,
                 )
-                return final_response.content[0].text.strip()
-
-            return final_text.strip() if final_text else "I couldn't generate a response."
+                reply = final_response.content[0].text.strip()
+            else:
+                reply = final_text.strip() if final_text else "I couldn't generate a response."
         except Exception as exc:
+            self._chat_messages = []  # may hold an unanswered user turn
             return f"Error: {exc}"
+
+        # Remember this exchange; the client sends it back as history next time
+        messages.append({"role": "assistant", "content": reply})
+        self._chat_messages = messages
+        self._chat_context = context_obj
+        self._chat_transcript_hash = _transcript_hash(
+            history + [{"role": "user", "content": user_message},
+                       {"role": "assistant", "content": reply}]
+        )
+        return reply
@@ -139,6 +139,8 @@ class AlphaMonitor:
         # Rolling price history (15-min window for trend/volatility analysis)
         self._price_history: list[tuple[float, float]] = []  # (timestamp, weighted_global_price)
         self.PRICE_HISTORY_WINDOW = 900  # 15 minutes in seconds
+        self._vol_cache: dict = {}
+        self._vol_cache_key: tuple | None = None
 
         # Full-contract settlement tracking (persists across minute boundaries)
         self._contract_settlement_prices: list[tuple[float, float]] = []
@@ -757,8 +759,20 @@ class AlphaMonitor:
           - volatility_5m: return stdev (used internally by fair value calc)
           - vol_dollar_per_min: average absolute BTC movement in $/min (intuitive metric)
           - regime: "high", "medium", or "low" based on $/min thresholds
+
+        Memoized until the next price tick or wall-clock second — it is called
+        several times per cycle (fair value, agent, dashboard) and each call
+        scans the full price history.
         """
         now = time.time()
+        last_tick_ts = self._price_history[-1][0] if self._price_history else 0.0
+        key = (last_tick_ts, int(now), config.VOL_HIGH_THRESHOLD, config.VOL_LOW_THRESHOLD)
+        if key != self._vol_cache_key:
+            self._vol_cache = self._compute_volatility(now)
+            self._vol_cache_key = key
+        return dict(self._vol_cache)
+
+    def _compute_volatility(self, now: float) -> dict:
         result = {"volatility_1m": 0.0, "volatility_5m": 0.0,
                   "vol_dollar_per_min": 0.0, "regime": "low"}
 
@@ -1,5 +1,6 @@
 import os
 import base64
+import hashlib
 import tempfile
 from dotenv import load_dotenv
 
@@ -10,15 +11,25 @@ def _decode_pem_if_needed(path_env_var: str, b64_env_var: str) -> str:
     """
     If a base64-encoded PEM is provided via env var, decode it to a temp file.
     Otherwise, use the path from the environment.
+
+    The temp file is named by a hash of the key, so restarts reuse it instead
+    of leaking a new file each boot. It is created owner-only (0600).
     """
     b64_key = os.getenv(b64_env_var)
     if b64_key:
-        # Decode base64 and write to temporary file
         pem_content = base64.b64decode(b64_key)
-        temp_file = tempfile.NamedTemporaryFile(mode='wb', delete=False, suffix='.pem')
-        temp_file.write(pem_content)
-        temp_file.close()
-        return temp_file.name
+        digest = hashlib.sha256(b64_key.encode()).hexdigest()[:16]
+        path = os.path.join(tempfile.gettempdir(), f"kalshi_{digest}.pem")
+        try:
+            if os.path.getsize(path) == len(pem_content):
+                return path
+            os.remove(path)  # partial write from an earlier boot — rewrite it
+        except FileNotFoundError:
+            pass
+        fd = os.open(path, os.O_WRONLY | os.O_CREAT | os.O_EXCL, 0o600)
+        with os.fdopen(fd, "wb") as f:
+            f.write(pem_content)
+        return path
     else:
         # Use the path from environment
         return os.getenv(path_env_var, "")
@@ -152,8 +163,22 @@ TUNABLE_FIELDS = {
 }
 
 
+def _make_coercer(spec: dict):
+    """Build a value -> typed/clamped value converter for one tunable spec."""
+    if spec["type"] == "bool":
+        return lambda v: v if isinstance(v, bool) else str(v).lower() in ("true", "1")
+    lo, hi = spec["min"], spec["max"]
+    if spec["type"] == "int":
+        return lambda v: max(lo, min(hi, int(v)))
+    return lambda v: max(lo, min(hi, float(v)))
+
+
+_COERCERS = {k: _make_coercer(spec) for k, spec in TUNABLE_FIELDS.items()}
+
+
 def get_tunables() -> dict:
-    return {k: getattr(__import__(__name__), k) for k in TUNABLE_FIELDS}
+    g = globals()
+    return {k: g[k] for k in TUNABLE_FIELDS if k in g}
 
 
 def set_tunables(updates: dict) -> dict:
@@ -161,16 +186,11 @@ def set_tunables(updates: dict) -> dict:
     from database import set_setting
     applied = {}
     for key, value in updates.items():
-        spec = TUNABLE_FIELDS.get(key)
-        if spec is None:
+        coerce = _COERCERS.get(key)
+        if coerce is None:
             continue
         try:
-            if spec["type"] == "bool":
-                value = value if isinstance(value, bool) else str(value).lower() in ("true", "1")
-            elif spec["type"] == "int":
-                value = max(spec["min"], min(spec["max"], int(value)))
-            elif spec["type"] == "float":
-                value = max(spec["min"], min(spec["max"], float(value)))
+            value = coerce(value)
             setattr(_self, key, value)
             set_setting(f"config_{key}", str(value))
             applied[key] = value
@@ -182,9 +202,10 @@ def set_tunables(updates: dict) -> dict:
 def restore_tunables():
     """Restore persisted tunable config values from the database."""
     import config as _self
-    from database import get_setting
+    from database import get_settings_bulk
+    saved_values = get_settings_bulk([f"config_{key}" for key in TUNABLE_FIELDS])
     for key, spec in TUNABLE_FIELDS.items():
-        saved = get_setting(f"config_{key}")
+        saved = saved_values.get(f"config_{key}")
         if saved is None:
             continue
         try:
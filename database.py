@@ -1,6 +1,10 @@
 import os
+import atexit
+import queue
 import sqlite3
 import json
+import threading
+import traceback
 from datetime import datetime, timezone
 from contextlib import contextmanager
 
@@ -124,12 +128,60 @@ def init_db():
             pass
 
 
+# --- Background writer for high-frequency log/decision rows ---
+# log_event() and record_decision() run on the trading hot path, so they only
+# enqueue; a daemon thread batches rows into one transaction per flush.
+_WRITE_BATCH = 64
+_WRITE_SQL = {
+    "log": "INSERT INTO logs (ts, level, message) VALUES (?, ?, ?)",
+    "decision": "INSERT INTO agent_decisions (ts, market_id, decision, confidence, reasoning, executed) "
+                "VALUES (?, ?, ?, ?, ?, ?)",
+}
+_WRITE_Q: queue.Queue = queue.Queue()
+
+
+def _flush_writes(batch: list[tuple[str, tuple]]):
+    rows_by_kind: dict[str, list[tuple]] = {}
+    for kind, row in batch:
+        rows_by_kind.setdefault(kind, []).append(row)
+    try:
+        with get_db() as conn:
+            for kind, rows in rows_by_kind.items():
+                conn.executemany(_WRITE_SQL[kind], rows)
+    except Exception:
+        traceback.print_exc()  # can't log_event() from here
+
+
+def _drain_writes():
+    while True:
+        batch = [_WRITE_Q.get()]
+        while len(batch) < _WRITE_BATCH:
+            try:
+                batch.append(_WRITE_Q.get_nowait())
+            except queue.Empty:
+                break
+        _flush_writes(batch)
+
+
+@atexit.register
+def _flush_pending_writes():
+    """Write out anything still queued at interpreter shutdown."""
+    batch = []
+    while True:
+        try:
+            batch.append(_WRITE_Q.get_nowait())
+        except queue.Empty:
+            break
+    if batch:
+        _flush_writes(batch)
+
+
+threading.Thread(target=_drain_writes, name="db-writer", daemon=True).start()
+
+
 def log_event(level: str, message: str):
-    with get_db() as conn:
-        conn.execute(
-            "INSERT INTO logs (ts, level, message) VALUES (?, ?, ?)",
-            (datetime.now(timezone.utc).isoformat(), level, message),
-        )
+    """Queue a log row; written asynchronously by the db-writer thread."""
+    _WRITE_Q.put(("log", (datetime.now(timezone.utc).isoformat(), level, message)))
 
 
 def record_trade(market_id: str, side: str, action: str, price: float,
@@ -149,13 +201,9 @@ def record_trade(market_id: str, side: str, action: str, price: float,
 
 def record_decision(market_id: str | None, decision: str, confidence: float,
                      reasoning: str, executed: bool = False):
-    with get_db() as conn:
-        conn.execute(
-            "INSERT INTO agent_decisions (ts, market_id, decision, confidence, reasoning, executed) "
-            "VALUES (?, ?, ?, ?, ?, ?)",
-            (datetime.now(timezone.utc).isoformat(), market_id, decision,
-             confidence, reasoning, int(executed)),
-        )
+    """Queue a decision row; written asynchronously by the db-writer thread."""
+    _WRITE_Q.put(("decision", (datetime.now(timezone.utc).isoformat(), market_id, decision,
+                               confidence, reasoning, int(executed))))
 
 
 def get_recent_logs(limit: int = 50) -> list[dict]:
@@ -735,6 +783,18 @@ def get_setting(key: str, default: str | None = None) -> str | None:
     return row["value"] if row else default
 
 
+def get_settings_bulk(keys: list[str]) -> dict[str, str]:
+    """Fetch several settings in one query. Keys with no saved value are omitted."""
+    if not keys:
+        return {}
+    placeholders = ", ".join("?" * len(keys))
+    with get_db() as conn:
+        rows = conn.execute(
+            f"SELECT key, value FROM settings WHERE key IN ({placeholders})", keys
+        ).fetchall()
+    return {r["key"]: r["value"] for r in rows}
+
+
 def set_setting(key: str, value: str):
     with get_db() as conn:
         conn.execute(